@@ -229,16 +229,20 @@ def register_cli_commands(parser):
     def add_command(name, command):
         help_title, help_body = parse_docstring(command)
         arg_name = safe_name(name)
+
+        def populate(command_parser, command=command):
+            command_parser.set_defaults(execute=command(command_parser))
+
         if command.hidden:
-            command_parser = parser.subparsers.add_parser(arg_name)
+            parser.subparsers.add_parser(arg_name, populate=populate)
         else:
-            command_parser = parser.subparsers.add_parser(
+            parser.subparsers.add_parser(
                 arg_name,
                 help=help_title,
                 description=help_title,
                 epilog=help_body,
+                populate=populate,
             )
-        command_parser.set_defaults(execute=command(command_parser))
 
     for name, command in commands.items():
         add_command(name, command)
@@ -15,6 +15,9 @@ class MAASConfiguration:
         if environ is None:
             environ = os.environ
         self._environ = environ
+        # Parsed file contents by filename, so repeated get() calls
+        # around an update don't reparse the YAML from disk.
+        self._cache = {}
 
     def get(self):
         """Return a dict with the current configuration."""
@@ -30,6 +33,7 @@ class MAASConfiguration:
         """Write the configuration data to `regiond.conf`."""
         config_file = self._config_dir / filename
         config_file.write_text(yaml.safe_dump(data, default_flow_style=False))
+        self._cache[filename] = dict(data)
 
     @property
     def _config_dir(self):
@@ -37,12 +41,17 @@ class MAASConfiguration:
 
     def _get_from_file(self, filename):
         """Return a dict with the config from the specified file."""
+        if filename in self._cache:
+            # Return a copy so that callers can't mutate the cache.
+            return dict(self._cache[filename])
         config_file = self._config_dir / filename
         if not config_file.exists():
             return {}
         data = yaml.safe_load(config_file.read_text())
         # if the file exists but is empty, data can be None
-        return data or {}
+        data = data or {}
+        self._cache[filename] = data
+        return dict(data)
 
     def _update_file(self, configs, filename):
         """Update configuration for the specified file."""
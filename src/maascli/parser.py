@@ -13,6 +13,58 @@ from maascli.cli import register_cli_commands
 from maascli.utils import parse_docstring
 
 
+class _LazyNameParserMap(dict):
+    """Subcommand name to parser map that populates parsers on demand.
+
+    Parsers registered with a `populate` callback are created empty; the
+    callback runs the first time the parser is looked up, i.e. when the
+    subcommand is actually selected (or inspected).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._populators = {}
+
+    def set_populator(self, name, populate):
+        self._populators[name] = populate
+
+    def _ensure_populated(self, name):
+        populate = self._populators.pop(name, None)
+        if populate is not None:
+            populate(dict.__getitem__(self, name))
+
+    def __getitem__(self, name):
+        self._ensure_populated(name)
+        return dict.__getitem__(self, name)
+
+    def get(self, name, default=None):
+        # dict.get bypasses __getitem__, so populate explicitly.
+        if name in self:
+            return self[name]
+        return default
+
+
+class _LazySubParsersAction(argparse._SubParsersAction):
+    """`_SubParsersAction` that defers populating subcommand parsers.
+
+    `add_parser` accepts an optional `populate` callable which is invoked
+    with the new parser the first time it is retrieved. This keeps
+    `add_argument` calls for the many unselected subcommands off the
+    common path.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._name_parser_map = _LazyNameParserMap()
+        self.choices = self._name_parser_map
+
+    def add_parser(self, name, *, populate=None, **kwargs):
+        parser = super().add_parser(name, **kwargs)
+        if populate is not None:
+            self._name_parser_map.set_populator(name, populate)
+        return parser
+
+
 class ArgumentParser(argparse.ArgumentParser):
     """Specialisation of argparse's parser with better support for subparsers.
 
@@ -40,6 +92,7 @@ class ArgumentParser(argparse.ArgumentParser):
         assert (
             self.__subparsers is None
         ), "Only one group of subparsers allowed."
+        kwargs.setdefault("action", _LazySubParsersAction)
         self.__subparsers = super().add_subparsers(
             title=title, metavar=metavar, **kwargs
         )
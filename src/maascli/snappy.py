@@ -5,21 +5,22 @@
 
 import argparse
 from collections import OrderedDict
+import configparser
+from functools import lru_cache
 import grp
+import http.client
+import itertools
 import os
 from pathlib import Path
 import pwd
 import signal
+import socket
 import subprocess
 import sys
 from textwrap import dedent
 import threading
 import time
-
-import netifaces
-import psycopg2
-from psycopg2.extensions import parse_dsn
-import tempita
+import xmlrpc.client
 
 from maascli.command import Command, CommandError
 from maascli.configfile import MAASConfiguration
@@ -115,11 +116,54 @@ ARGUMENTS = OrderedDict(
     ]
 )
 
+# The same arguments grouped by run mode, computed once so that
+# cmd_init doesn't have to re-walk ARGUMENTS (copying each kwargs dict)
+# on every invocation.
+_ARGS_BY_MODE = {"region+rack": [], "region": [], "rack": []}
+for _argument, _kwargs in ARGUMENTS.items():
+    _kwargs = _kwargs.copy()
+    for _mode in _kwargs.pop("for_mode"):
+        _ARGS_BY_MODE[_mode].append(("--%s" % _argument, _kwargs))
+del _argument, _kwargs, _mode
+
 NON_ROOT_USER = "snap_daemon"
 
 
+@lru_cache(maxsize=None)
+def get_snap_path(*paths):
+    """Return a path under $SNAP.
+
+    The snap environment never changes for the lifetime of the process,
+    so resolved paths are cached.
+    """
+    return os.path.join(os.environ["SNAP"], *paths)
+
+
+@lru_cache(maxsize=None)
+def get_snap_common_path(*paths):
+    """Return a path under $SNAP_COMMON."""
+    return os.path.join(os.environ["SNAP_COMMON"], *paths)
+
+
+@lru_cache(maxsize=None)
+def get_snap_data_path(*paths):
+    """Return a path under $SNAP_DATA."""
+    return os.path.join(os.environ["SNAP_DATA"], *paths)
+
+
+def _clear_snap_path_caches():
+    """Forget cached snap paths (for tests that change the environment)."""
+    get_snap_path.cache_clear()
+    get_snap_common_path.cache_clear()
+    get_snap_data_path.cache_clear()
+
+
 def get_default_gateway_ip():
     """Return the default gateway IP."""
+    # Imported here so that commands that never inspect the network
+    # don't pay for it at startup.
+    import netifaces
+
     gateways = netifaces.gateways()
     defaults = gateways.get("default")
     if not defaults:
@@ -146,17 +190,33 @@ def get_default_url():
 
 def get_mode_filepath():
     """Return the path to the 'snap_mode' file."""
-    return os.path.join(os.environ["SNAP_COMMON"], "snap_mode")
+    return get_snap_common_path("snap_mode")
+
+
+def _read_small_file(path):
+    """Return the content of a small file, or None if it doesn't exist.
+
+    Reads with a bare open/read/close syscall triple; the files read this
+    way (snap_mode, supervisord.pid, secret) are all well under 1KiB and
+    don't warrant buffered I/O or a separate existence check.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        data = os.read(fd, 1024)
+    finally:
+        os.close(fd)
+    return data.decode("utf-8")
 
 
 def get_current_mode():
     """Gets the current mode of the snap."""
-    filepath = get_mode_filepath()
-    if os.path.exists(filepath):
-        with open(get_mode_filepath(), "r") as fp:
-            return fp.read().strip()
-    else:
+    mode = _read_small_file(get_mode_filepath())
+    if mode is None:
         return "none"
+    return mode.strip()
 
 
 def set_current_mode(mode):
@@ -165,6 +225,20 @@ def set_current_mode(mode):
         fp.write(mode.strip())
 
 
+@lru_cache(maxsize=None)
+def _load_supervisord_template(template_path):
+    """Parse the supervisord template once per path.
+
+    The template ships read-only inside the snap, so the parsed form can
+    be reused for every render.
+    """
+    # Imported here so that commands that never render the config don't
+    # pay for it at startup.
+    import tempita
+
+    return tempita.Template.from_filename(template_path, encoding="UTF-8")
+
+
 def render_supervisord(mode):
     """Render the 'supervisord.conf' based on the mode."""
     conf_vars = {"regiond": False, "rackd": False}
@@ -172,50 +246,86 @@ def render_supervisord(mode):
         conf_vars["regiond"] = True
     if mode in ["region+rack", "rack"]:
         conf_vars["rackd"] = True
-    template = tempita.Template.from_filename(
-        os.path.join(
-            os.environ["SNAP"],
-            "usr",
-            "share",
-            "maas",
-            "supervisord.conf.template",
-        ),
-        encoding="UTF-8",
+    template = _load_supervisord_template(
+        get_snap_path("usr", "share", "maas", "supervisord.conf.template")
     )
     rendered = template.substitute(conf_vars)
-    conf_path = os.path.join(
-        os.environ["SNAP_DATA"], "supervisord", "supervisord.conf"
-    )
+    conf_path = get_snap_data_path("supervisord", "supervisord.conf")
     with open(conf_path, "w") as fp:
         fp.write(rendered)
 
 
 def get_supervisord_pid():
     """Get the running supervisord pid."""
-    pid_path = os.path.join(
-        os.environ["SNAP_DATA"], "supervisord", "supervisord.pid"
+    pid = _read_small_file(
+        get_snap_data_path("supervisord", "supervisord.pid")
     )
-    if os.path.exists(pid_path):
-        with open(pid_path, "r") as fp:
-            return int(fp.read().strip())
-    else:
+    if pid is None:
         return None
+    return int(pid.strip())
 
 
-def sighup_supervisord():
-    """Cause supervisord to stop all processes, reload configuration, and
-    start all processes."""
-    pid = get_supervisord_pid()
-    if pid is None:
-        return
+class _SupervisordHTTPConnection(http.client.HTTPConnection):
+    """An HTTP connection over supervisord's Unix socket."""
+
+    def __init__(self, socket_path):
+        super().__init__("localhost")
+        self._socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self._socket_path)
+        self.sock = sock
+
+
+class _SupervisordTransport(xmlrpc.client.Transport):
+    """XML-RPC transport that talks to supervisord's Unix socket."""
+
+    def __init__(self, socket_path):
+        super().__init__()
+        self._socket_path = socket_path
+
+    def make_connection(self, host):
+        return _SupervisordHTTPConnection(self._socket_path)
+
 
+def _get_supervisord_socket_path():
+    """Return the path of supervisord's XML-RPC socket.
+
+    The location is read from the rendered supervisord.conf — the file
+    `render_supervisord` writes — so it stays in step with whatever the
+    [unix_http_server] section declares. If the file is missing or
+    doesn't declare a socket, fall back to the conventional location
+    next to it.
+    """
+    conf_path = get_snap_data_path("supervisord", "supervisord.conf")
+    parser = configparser.ConfigParser(interpolation=None)
     try:
-        os.kill(pid, signal.SIGHUP)
-    except ProcessLookupError:
-        return
+        with open(conf_path, "r") as fp:
+            parser.read_file(fp)
+        socket_path = parser["unix_http_server"]["file"]
+    except (OSError, configparser.Error, KeyError):
+        return get_snap_data_path("supervisord", "supervisord.sock")
+    # supervisord expands %(here)s to the configuration file's directory.
+    return socket_path.strip().replace("%(here)s", os.path.dirname(conf_path))
+
+
+def _supervisord_rpc():
+    """Return the 'supervisor' XML-RPC namespace of the local supervisord."""
+    proxy = xmlrpc.client.ServerProxy(
+        "http://localhost/RPC2",
+        transport=_SupervisordTransport(_get_supervisord_socket_path()),
+    )
+    return proxy.supervisor
+
+
+def _wait_for_supervisord_ctl():
+    """Wait for supervisord using the 'run-supervisorctl' script.
 
-    # Wait for supervisord to be running successfully.
-    time.sleep(0.5)
+    Fallback for when the RPC socket cannot be reached directly:
+    supervisorctl locates the socket through supervisord's own
+    configuration machinery, at the cost of a fork per probe.
+    """
     while True:
         process = subprocess.Popen(
             [
@@ -224,13 +334,64 @@ def sighup_supervisord():
             ],
             stdout=subprocess.PIPE,
         )
-        process.wait()
-        output = process.stdout.read().decode("utf-8")
-        # Error message is printed until supervisord is running correctly.
-        if "error:" in output:
+        output, _ = process.communicate()
+        # An error message is printed until supervisord answers properly.
+        if "error:" in output.decode("utf-8"):
             time.sleep(1)
         else:
-            break
+            return
+
+
+def _wait_for_supervisord(expect_reload=False):
+    """Wait until supervisord is answering RPC and done starting processes.
+
+    While supervisord re-reads its configuration its RPC socket goes
+    away; poll in-process over the Unix socket instead of forking
+    'run-supervisorctl status' for every probe.
+
+    With `expect_reload`, a probe racing the SIGHUP can still observe
+    the pre-reload state with every process running, so an all-running
+    answer only counts as success once evidence of the reload — a
+    failed RPC or a not-running process — has been seen, or a few
+    seconds have passed in case the reload was too quick to observe.
+
+    If RPC still cannot be reached once those few seconds have passed,
+    fall back to probing with supervisorctl rather than looping forever
+    against a socket that may not be where the configuration says.
+    """
+    reload_seen = not expect_reload
+    deadline = time.monotonic() + 5.0
+    while True:
+        try:
+            infos = _supervisord_rpc().getAllProcessInfo()
+        except (OSError, http.client.HTTPException, xmlrpc.client.Error):
+            # Not (yet) accepting RPC; the reload is still in progress.
+            reload_seen = True
+            if time.monotonic() > deadline:
+                return _wait_for_supervisord_ctl()
+        else:
+            if any(info["statename"] != "RUNNING" for info in infos):
+                reload_seen = True
+            starting = any(info["statename"] == "STARTING" for info in infos)
+            if not starting and (reload_seen or time.monotonic() > deadline):
+                return
+        time.sleep(0.05)
+
+
+def sighup_supervisord():
+    """Cause supervisord to stop all processes, reload configuration, and
+    start all processes."""
+    pid = get_supervisord_pid()
+    if pid is None:
+        return
+
+    try:
+        os.kill(pid, signal.SIGHUP)
+    except ProcessLookupError:
+        return
+
+    # Wait for supervisord to act on the signal and settle again.
+    _wait_for_supervisord(expect_reload=True)
 
 
 def print_config_value(config, key, hidden=False):
@@ -247,10 +408,9 @@ def _get_rpc_secret_path() -> Path:
 
 def get_rpc_secret():
     """Get the current RPC secret."""
-    secret = None
-    secret_path = _get_rpc_secret_path()
-    if secret_path.exists():
-        secret = secret_path.read_text().strip()
+    secret = _read_small_file(str(_get_rpc_secret_path()))
+    if secret:
+        secret = secret.strip()
     if secret:
         return secret
 
@@ -302,10 +462,20 @@ def print_config(
                 print_config_value(config, "debug_queries")
 
 
+@lru_cache(maxsize=8)
+def _uid_gid(username):
+    """Resolve a username to (uid, gid), caching the NSS lookups.
+
+    The mappings cannot change for the users this deals with (root and
+    the snap daemon user), so there's no point re-reading the passwd and
+    group databases on every privilege switch.
+    """
+    return pwd.getpwnam(username).pw_uid, grp.getgrnam(username).gr_gid
+
+
 def change_user(username, effective=False):
     """Change running user, by default to the non-root user."""
-    running_uid = pwd.getpwnam(username).pw_uid
-    running_gid = grp.getgrnam(username).gr_gid
+    running_uid, running_gid = _uid_gid(username)
     os.setgroups([])
     if effective:
         os.setegid(running_gid)
@@ -319,27 +489,20 @@ def migrate_db(capture=False):
     """Migrate the database."""
     if capture:
         process = subprocess.Popen(
-            [
-                os.path.join(os.environ["SNAP"], "bin", "maas-region"),
-                "dbupgrade",
-            ],
+            [get_snap_path("bin", "maas-region"), "dbupgrade"],
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
         )
-        ret = process.wait()
-        output = process.stdout.read().decode("utf-8")
-        if ret != 0:
+        output, _ = process.communicate()
+        if process.returncode != 0:
             clear_line()
             print_msg("Failed to perfom migrations:")
-            print_msg(output)
+            print_msg(output.decode("utf-8"))
             print_msg("")
-            sys.exit(ret)
+            sys.exit(process.returncode)
     else:
         subprocess.check_call(
-            [
-                os.path.join(os.environ["SNAP"], "bin", "maas-region"),
-                "dbupgrade",
-            ]
+            [get_snap_path("bin", "maas-region"), "dbupgrade"]
         )
 
 
@@ -351,36 +514,27 @@ def clear_line():
         )
 
 
-def perform_work(msg, cmd, *args, **kwargs):
-    """Perform work.
+SPINNER_FRAMES = "/-\\|/-\\|"
 
-    Executes the `cmd` and while its running it prints a nice message.
-    """
-    # When not running in a terminal, just print the message once and perform
-    # the operation.
-    if not sys.stdout.isatty():
-        print_msg(msg)
-        return cmd(*args, **kwargs)
 
-    spinner = {
-        0: "/",
-        1: "-",
-        2: "\\",
-        3: "|",
-        4: "/",
-        5: "-",
-        6: "\\",
-        7: "|",
-    }
+def _spinner_frames(msg):
+    """Render the full spinner frames for `msg` up front."""
+    return [f"\r[{c}] {msg}" for c in SPINNER_FRAMES]
+
+
+def _perform_work_with_thread(msg, cmd, *args, **kwargs):
+    """Run `cmd` with a thread animating the spinner.
+
+    Fallback for when a SIGALRM timer cannot be used, i.e. when not
+    running on the main thread.
+    """
+    frames = itertools.cycle(_spinner_frames(msg))
 
     def _write_msg(evnt):
-        idx = 0
         while not evnt.is_set():
             # Print the message with a spinner until the work is complete.
-            print_msg("\r[%s] %s" % (spinner[idx], msg), newline=False)
-            idx += 1
-            if idx == 8:
-                idx = 0
+            sys.stdout.write(next(frames))
+            sys.stdout.flush()
             time.sleep(0.25)
         # Clear the line so previous message is not show if the next message
         # is not as long as this message.
@@ -400,6 +554,43 @@ def perform_work(msg, cmd, *args, **kwargs):
     return ret
 
 
+def perform_work(msg, cmd, *args, **kwargs):
+    """Perform work.
+
+    Executes the `cmd` and while its running it prints a nice message.
+    """
+    # When not running in a terminal, just print the message once and perform
+    # the operation.
+    if not sys.stdout.isatty():
+        print_msg(msg)
+        return cmd(*args, **kwargs)
+
+    if threading.current_thread() is not threading.main_thread():
+        # SIGALRM can only be managed from the main thread.
+        return _perform_work_with_thread(msg, cmd, *args, **kwargs)
+
+    # Animate the spinner from a kernel interval timer instead of a
+    # dedicated thread; the work happens uninterrupted in between ticks.
+    frames = itertools.cycle(_spinner_frames(msg))
+
+    def _tick(signum, frame):
+        sys.stdout.write(next(frames))
+        sys.stdout.flush()
+
+    previous_handler = signal.signal(signal.SIGALRM, _tick)
+    signal.setitimer(signal.ITIMER_REAL, 0.25, 0.25)
+    try:
+        ret = cmd(*args, **kwargs)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+        # Clear the line so previous message is not show if the next message
+        # is not as long as this message.
+        print_msg("\r" + " " * (len(msg) + 4), newline=False)
+    clear_line()
+    return ret
+
+
 def required_prompt(title, help_text=None, default=None):
     """Prompt for required input."""
     value = None
@@ -448,8 +639,13 @@ def get_database_settings(options):
     maas-test-db snap is installed and connected.
 
     """
+    # Imported here so that commands that never touch the database don't
+    # pay for psycopg2 at startup.
+    import psycopg2
+    from psycopg2.extensions import parse_dsn
+
     database_uri = options.database_uri
-    test_db_socket = os.path.join(os.environ["SNAP_COMMON"], "test-db-socket")
+    test_db_socket = get_snap_common_path("test-db-socket")
     test_db_uri = f"postgres:///maasdb?host={test_db_socket}&user=maas"
     if database_uri is None:
         default_uri = None
@@ -544,13 +740,9 @@ class cmd_init(SnappyCommand):
             help="Rack controller only",
             description=("Initialise MAAS to run only a rack controller."),
         )
-        for argument, kwargs in ARGUMENTS.items():
-            kwargs = kwargs.copy()
-            for_modes = kwargs.pop("for_mode")
-            for for_mode in for_modes:
-                subparsers_map[for_mode].add_argument(
-                    "--%s" % argument, **kwargs
-                )
+        for for_mode, arguments in _ARGS_BY_MODE.items():
+            for flag, kwargs in arguments:
+                subparsers_map[for_mode].add_argument(flag, **kwargs)
 
         for for_mode in ("region+rack", "region", "rack"):
             subparsers_map[for_mode].add_argument(
@@ -615,13 +807,9 @@ class cmd_init(SnappyCommand):
                     "Secret", help_text=ARGUMENTS["secret"]["help"]
                 )
 
-        if current_mode != "none":
-
-            def stop_services():
-                render_supervisord("none")
-                sighup_supervisord()
-
-            perform_work("Stopping services", stop_services)
+        # Don't stop services here: supervisord picks up the new
+        # configuration on the single SIGHUP in _finalize_init, so a
+        # mode change costs one restart cycle instead of two.
 
         # Configure the settings.
         settings = {"maas_url": maas_url}
@@ -676,22 +864,26 @@ class cmd_config(SnappyCommand):
 
     # Required options based on mode.
     required_options = {
-        "region+rack": [
-            "maas_url",
-            "database_host",
-            "database_name",
-            "database_user",
-            "database_pass",
-        ],
-        "region": [
-            "maas_url",
-            "database_host",
-            "database_name",
-            "database_user",
-            "database_pass",
-        ],
-        "rack": ["maas_url", "secret"],
-        "none": [],
+        "region+rack": frozenset(
+            (
+                "maas_url",
+                "database_host",
+                "database_name",
+                "database_user",
+                "database_pass",
+            )
+        ),
+        "region": frozenset(
+            (
+                "maas_url",
+                "database_host",
+                "database_name",
+                "database_user",
+                "database_pass",
+            )
+        ),
+        "rack": frozenset(("maas_url", "secret")),
+        "none": frozenset(),
     }
 
     # Required flags that are in .conf.
@@ -722,6 +914,10 @@ class cmd_config(SnappyCommand):
         },
     }
 
+    # Every flag that switches `maas config` from display mode into
+    # configuration mode, precomputed once.
+    _all_setting_flags = ("secret",) + setting_flags + tuple(optional_flags)
+
     def __init__(self, parser):
         super().__init__(parser)
         parser.add_argument(
@@ -764,12 +960,12 @@ class cmd_config(SnappyCommand):
         """
         Validate the flags are correct for the current mode or the new mode.
         """
-        invalid_flags = []
-        for flag in self.setting_flags + ("secret",):
-            if flag not in self.required_options[running_mode] and getattr(
-                options, flag
-            ):
-                invalid_flags.append("--%s" % flag.replace("_", "-"))
+        required = self.required_options[running_mode]
+        invalid_flags = [
+            "--%s" % flag.replace("_", "-")
+            for flag in self.setting_flags + ("secret",)
+            if flag not in required and getattr(options, flag)
+        ]
         if len(invalid_flags) > 0:
             print_msg(
                 "Following flags are not supported in '%s' mode: %s"
@@ -794,14 +990,9 @@ class cmd_config(SnappyCommand):
         in_config_mode = options.show
         if not in_config_mode:
             in_config_mode = not any(
-                (
-                    getattr(options, flag) is not None
-                    and getattr(options, flag) is not False
-                )
-                for flag in (
-                    ("secret",)
-                    + self.setting_flags
-                    + tuple(self.optional_flags.keys())
+                value is not None and value is not False
+                for value in (
+                    getattr(options, flag) for flag in self._all_setting_flags
                 )
             )
 
@@ -881,17 +1072,13 @@ class cmd_status(SnappyCommand):
             print_msg("MAAS is not configured")
             sys.exit(1)
         else:
-            process = subprocess.Popen(
-                [
-                    os.path.join(
-                        os.environ["SNAP"], "bin", "run-supervisorctl"
-                    ),
-                    "status",
-                ],
+            process = subprocess.run(
+                [get_snap_path("bin", "run-supervisorctl"), "status"],
                 stdout=subprocess.PIPE,
+                text=True,
             )
-            ret = process.wait()
-            output = process.stdout.read().decode("utf-8")
+            ret = process.returncode
+            output = process.stdout
             if ret == 0:
                 print_msg(output, newline=False)
             else:
@@ -51,6 +51,29 @@ class TestMAASConfiguration(MAASTestCase):
     def test_get_empty(self):
         self.assertEqual(self.config_manager.get(), {})
 
+    def test_get_caches_parsed_config(self):
+        config = {factory.make_name("key"): factory.make_name("value")}
+        self.write_config(config, "regiond.conf")
+        self.assertEqual(self.config_manager.get(), config)
+        (self.config_dir / "regiond.conf").unlink()
+        self.assertEqual(self.config_manager.get(), config)
+
+    def test_get_returns_copy(self):
+        config = {factory.make_name("key"): factory.make_name("value")}
+        self.write_config(config, "regiond.conf")
+        self.config_manager.get().clear()
+        self.assertEqual(self.config_manager.get(), config)
+
+    def test_get_reflects_update(self):
+        config1 = {"foo": "bar"}
+        config2 = {"baz": "bza"}
+        self.write_config(config1, "regiond.conf")
+        self.assertEqual(self.config_manager.get(), config1)
+        self.config_manager.update(config2)
+        self.assertEqual(
+            self.config_manager.get(), {"foo": "bar", "baz": "bza"}
+        )
+
     def test_write_to_file(self):
         config = {
             factory.make_name("key"): factory.make_name("value"),
@@ -5,10 +5,11 @@
 
 
 import sys
+from unittest.mock import Mock
 
 from maascli.parser import ArgumentParser, prepare_parser
 from maastesting.factory import factory
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 from maastesting.testcase import MAASTestCase
 
 
@@ -40,6 +41,22 @@ class TestArgumentParser(MAASTestCase):
         # object.
         self.assertIs(subparsers, parser.subparsers)
 
+    def test_add_parser_defers_populate_until_lookup(self):
+        parser = ArgumentParser()
+        populate = Mock()
+        parser.subparsers.add_parser("sample", populate=populate)
+        self.assertThat(populate, MockNotCalled())
+        subparser = parser.subparsers.choices["sample"]
+        self.assertThat(populate, MockCalledOnceWith(subparser))
+
+    def test_add_parser_populates_only_once(self):
+        parser = ArgumentParser()
+        populate = Mock()
+        parser.subparsers.add_parser("sample", populate=populate)
+        subparser = parser.subparsers.choices["sample"]
+        self.assertIs(subparser, parser.subparsers.choices.get("sample"))
+        self.assertThat(populate, MockCalledOnceWith(subparser))
+
     def test_bad_arguments_prints_help_to_stderr(self):
         argv = ["maas", factory.make_name(prefix="profile"), "nodes"]
         parser = prepare_parser(argv)
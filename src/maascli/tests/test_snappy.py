@@ -9,11 +9,9 @@ import os
 from pathlib import Path
 import random
 import signal
-import subprocess
 import sys
 from textwrap import dedent
 import time
-from unittest.mock import MagicMock
 
 from fixtures import EnvironmentVariableFixture
 import netifaces
@@ -34,6 +32,8 @@ class TestHelpers(MAASTestCase):
         snap_data = self.make_dir()
         self.environ = {"SNAP_COMMON": snap_common, "SNAP_DATA": snap_data}
         self.patch(os, "environ", self.environ)
+        snappy._clear_snap_path_caches()
+        self.addCleanup(snappy._clear_snap_path_caches)
 
     def test_get_default_gateway_ip_no_defaults(self):
         self.patch(netifaces, "gateways").return_value = {}
@@ -171,6 +171,8 @@ class TestRenderSupervisord(MAASTestCase):
         os.mkdir(os.path.join(snap_data, "supervisord"))
         self.environ = {"SNAP": snap, "SNAP_DATA": snap_data}
         self.patch(os, "environ", self.environ)
+        snappy._clear_snap_path_caches()
+        self.addCleanup(snappy._clear_snap_path_caches)
 
     def get_rendered_config(self):
         with open(
@@ -195,6 +197,12 @@ class TestRenderSupervisord(MAASTestCase):
 
 
 class TestSupervisordHelpers(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        # Each test installs its own snap environment.
+        snappy._clear_snap_path_caches()
+        self.addCleanup(snappy._clear_snap_path_caches)
+
     def test_get_supervisord_pid_returns_None(self):
         snap_data = self.make_dir()
         self.patch(os, "environ", {"SNAP_DATA": snap_data})
@@ -212,31 +220,47 @@ class TestSupervisordHelpers(MAASTestCase):
         self.patch(os, "environ", {"SNAP_DATA": snap_data})
         self.assertEqual(pid, snappy.get_supervisord_pid())
 
+    def test_get_supervisord_socket_path_reads_rendered_conf(self):
+        snap_data = self.make_dir()
+        supervisord_dir = os.path.join(snap_data, "supervisord")
+        os.makedirs(supervisord_dir)
+        with open(
+            os.path.join(supervisord_dir, "supervisord.conf"), "w"
+        ) as stream:
+            stream.write("[unix_http_server]\nfile=%(here)s/custom.sock\n")
+        self.patch(os, "environ", {"SNAP_DATA": snap_data})
+        self.assertEqual(
+            os.path.join(supervisord_dir, "custom.sock"),
+            snappy._get_supervisord_socket_path(),
+        )
+
+    def test_get_supervisord_socket_path_falls_back_without_conf(self):
+        snap_data = self.make_dir()
+        self.patch(os, "environ", {"SNAP_DATA": snap_data})
+        self.assertEqual(
+            os.path.join(snap_data, "supervisord", "supervisord.sock"),
+            snappy._get_supervisord_socket_path(),
+        )
+
     def test_sighup_supervisord_sends_SIGHUP(self):
         pid = random.randint(2, 99)
-        snap = self.make_dir()
-        self.patch(os, "environ", {"SNAP": snap})
         self.patch(snappy, "get_supervisord_pid").return_value = pid
         mock_kill = self.patch(os, "kill")
         self.patch(time, "sleep")  # Speed up the test.
-        mock_process = MagicMock()
-        mock_popen = self.patch(subprocess, "Popen")
-        mock_popen.return_value = mock_process
+        # Let the reload-evidence deadline lapse on the first probe.
+        self.patch(time, "monotonic").side_effect = [0, 10]
+        mock_rpc = self.patch(snappy, "_supervisord_rpc")
+        mock_rpc.return_value.getAllProcessInfo.return_value = [
+            {"statename": "RUNNING"}
+        ]
         snappy.sighup_supervisord()
         self.assertThat(mock_kill, MockCalledOnceWith(pid, signal.SIGHUP))
         self.assertThat(
-            mock_popen,
-            MockCalledOnceWith(
-                [os.path.join(snap, "bin", "run-supervisorctl"), "status"],
-                stdout=subprocess.PIPE,
-            ),
+            mock_rpc.return_value.getAllProcessInfo, MockCalledOnceWith()
         )
-        self.assertThat(mock_process.wait, MockCalledOnceWith())
 
     def test_sighup_supervisord_nop_if_not_running(self):
         pid = random.randint(2, 99)
-        snap = self.make_dir()
-        self.patch(os, "environ", {"SNAP": snap})
         self.patch(snappy, "get_supervisord_pid").return_value = pid
         mock_kill = self.patch(os, "kill")
         mock_kill.side_effect = ProcessLookupError()
@@ -244,20 +268,53 @@ class TestSupervisordHelpers(MAASTestCase):
         snappy.sighup_supervisord()
         mock_kill.assert_called_once_with(pid, signal.SIGHUP)
 
-    def test_sighup_supervisord_waits_until_no_error(self):
+    def test_sighup_supervisord_waits_until_supervisord_is_back(self):
+        pid = random.randint(2, 99)
+        self.patch(snappy, "get_supervisord_pid").return_value = pid
+        mock_kill = self.patch(os, "kill")
+        self.patch(time, "sleep")  # Speed up the test.
+        mock_rpc = self.patch(snappy, "_supervisord_rpc")
+        mock_rpc.return_value.getAllProcessInfo.side_effect = [
+            ConnectionRefusedError(),
+            [{"statename": "STARTING"}],
+            [{"statename": "RUNNING"}],
+        ]
+        snappy.sighup_supervisord()
+        self.assertThat(mock_kill, MockCalledOnceWith(pid, signal.SIGHUP))
+        self.assertEqual(3, mock_rpc.return_value.getAllProcessInfo.call_count)
+
+    def test_sighup_supervisord_ignores_pre_reload_state(self):
         pid = random.randint(2, 99)
-        snap = self.make_dir()
-        self.patch(os, "environ", {"SNAP": snap})
         self.patch(snappy, "get_supervisord_pid").return_value = pid
         mock_kill = self.patch(os, "kill")
         self.patch(time, "sleep")  # Speed up the test.
-        mock_process = MagicMock()
-        mock_process.stdout.read.side_effect = [b"error:", b""]
-        mock_popen = self.patch(subprocess, "Popen")
-        mock_popen.return_value = mock_process
+        mock_rpc = self.patch(snappy, "_supervisord_rpc")
+        # The first probe races the SIGHUP and sees the pre-reload
+        # state; success must wait for evidence of the reload.
+        mock_rpc.return_value.getAllProcessInfo.side_effect = [
+            [{"statename": "RUNNING"}],
+            ConnectionRefusedError(),
+            [{"statename": "RUNNING"}],
+        ]
+        snappy.sighup_supervisord()
+        self.assertThat(mock_kill, MockCalledOnceWith(pid, signal.SIGHUP))
+        self.assertEqual(3, mock_rpc.return_value.getAllProcessInfo.call_count)
+
+    def test_sighup_supervisord_falls_back_to_supervisorctl(self):
+        pid = random.randint(2, 99)
+        self.patch(snappy, "get_supervisord_pid").return_value = pid
+        mock_kill = self.patch(os, "kill")
+        self.patch(time, "sleep")  # Speed up the test.
+        # Make the deadline lapse while RPC is still failing.
+        self.patch(time, "monotonic").side_effect = [0, 10]
+        mock_rpc = self.patch(snappy, "_supervisord_rpc")
+        mock_rpc.return_value.getAllProcessInfo.side_effect = (
+            ConnectionRefusedError()
+        )
+        mock_ctl = self.patch(snappy, "_wait_for_supervisord_ctl")
         snappy.sighup_supervisord()
         self.assertThat(mock_kill, MockCalledOnceWith(pid, signal.SIGHUP))
-        self.assertEqual(2, mock_popen.call_count)
+        self.assertThat(mock_ctl, MockCalledOnceWith())
 
 
 class TestConfigHelpers(MAASTestCase):
@@ -328,6 +385,8 @@ class TestCmdInit(MAASTestCase):
                 "SNAP_DATA": "/snap/maas/data",
             },
         )
+        snappy._clear_snap_path_caches()
+        self.addCleanup(snappy._clear_snap_path_caches)
         self.mock_read_input = self.patch(snappy, "read_input")
 
     def test_init_snap_db_options_prompt(self):
@@ -584,6 +643,8 @@ class TestCmdConfig(MAASTestCase):
         snap_data = self.make_dir()
         self.useFixture(EnvironmentVariableFixture("SNAP_COMMON", snap_common))
         self.useFixture(EnvironmentVariableFixture("SNAP_DATA", snap_data))
+        snappy._clear_snap_path_caches()
+        self.addCleanup(snappy._clear_snap_path_caches)
 
     def test_show(self):
         # Regression test for LP:1892868
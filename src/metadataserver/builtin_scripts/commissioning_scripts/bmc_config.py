@@ -81,6 +81,16 @@ from paramiko.client import MissingHostKeyPolicy, SSHClient
 import yaml
 
 
+# BMC passwords are credentials; draw them from the OS entropy pool
+# rather than the seedable Mersenne Twister.
+_random = random.SystemRandom()
+
+# Pre-built alphabets for password generation, so each generated
+# character doesn't re-concatenate the source strings.
+_PASSWORD_SPECIAL_CHARS = "!\"#$%&'()*+-./:;<=>?@[\\]^_`{|}~"
+_PASSWORD_ALPHABET = string.ascii_letters + string.digits
+
+
 def exit_skipped():
     """Write a result YAML indicating the test has been skipped."""
     result_path = os.environ.get("RESULT_PATH")
@@ -289,44 +299,38 @@ class IPMI(BMCConfig):
     def _generate_random_password(
         self, min_length=10, max_length=15, with_special_chars=False
     ):
-        length = random.randint(min_length, max_length)
-        special_chars = "!\"#$%&'()*+-./:;<=>?@[\\]^_`{|}~"
-        letters = ""
+        length = _random.randint(min_length, max_length)
         if with_special_chars:
             # LP: #1621175 - Password generation for non-compliant IPMI password
             # policy. Huawei has implemented a different password policy that
             # does not confirm with the IPMI spec, hence we generate a password
             # that would be compliant to their use case.
             # Randomly select 2 Upper Case
-            letters += "".join(
-                [random.choice(string.ascii_uppercase) for _ in range(2)]
+            letters = "".join(
+                _random.choice(string.ascii_uppercase) for _ in range(2)
             )
             # Randomly select 2 Lower Case
             letters += "".join(
-                [random.choice(string.ascii_lowercase) for _ in range(2)]
+                _random.choice(string.ascii_lowercase) for _ in range(2)
             )
             # Randomly select 2 numbers
-            letters += "".join(
-                [random.choice(string.digits) for _ in range(2)]
-            )
+            letters += "".join(_random.choice(string.digits) for _ in range(2))
             # Randomly select a special character
-            letters += random.choice(special_chars)
+            letters += _random.choice(_PASSWORD_SPECIAL_CHARS)
             # Create the extra characters to fullfill max_length
             letters += "".join(
-                [
-                    random.choice(string.ascii_letters)
-                    for _ in range(length - 7)
-                ]
+                _random.choice(string.ascii_letters) for _ in range(length - 7)
             )
             # LP: #1758760 - Randomly mix the password until we ensure there's
             # not consecutive occurrences of the same character.
-            password = "".join(random.sample(letters, len(letters)))
+            password = "".join(_random.sample(letters, len(letters)))
             while bool(re.search(r"(.)\1", password)):
-                password = "".join(random.sample(letters, len(letters)))
+                password = "".join(_random.sample(letters, len(letters)))
             return password
         else:
-            letters = string.ascii_letters + string.digits
-            return "".join([random.choice(letters) for _ in range(length)])
+            return "".join(
+                _random.choice(_PASSWORD_ALPHABET) for _ in range(length)
+            )
 
     def _get_ipmi_priv(self):
         """Map ipmitool name to IPMI spec name
@@ -12,6 +12,7 @@ from testtools.matchers import Not, StartsWith
 from testtools.testcase import ExpectedException
 
 from maastesting.factory import factory
+from maastesting.matchers import MockAnyCall, MockNotCalled
 from maastesting.testcase import MAASTestCase
 from provisioningserver.boot import tftppath
 from provisioningserver.boot.tftppath import (
@@ -192,6 +193,42 @@ class TestTFTPPath(MAASTestCase):
             self.make_image_dir(param, self.tftproot)
         self.assertItemsEqual([], list_boot_images(self.tftproot))
 
+    def test_list_boot_images_caches_result_while_tree_unchanged(self):
+        params = make_boot_image_storage_params()
+        self.make_image_dir(params, self.tftproot)
+        purposes = ["install", "commissioning", "xinstall"]
+        make_osystem(self, params["osystem"], purposes)
+        first = list_boot_images(self.tftproot)
+        mock_walk_paths = self.patch(tftppath, "_walk_paths")
+        second = list_boot_images(self.tftproot)
+        self.assertEqual(first, second)
+        self.assertThat(mock_walk_paths, MockNotCalled())
+
+    def test_list_boot_images_recomputes_when_maas_meta_written(self):
+        params = make_boot_image_storage_params()
+        self.make_image_dir(params, self.tftproot)
+        purposes = ["install", "commissioning", "xinstall"]
+        make_osystem(self, params["osystem"], purposes)
+        list_boot_images(self.tftproot)
+        metadata = dict(subarches=factory.make_name("subarches"))
+        self.make_meta_file(params, metadata, self.tftproot)
+        mock_walk_paths = self.patch(
+            tftppath, "_walk_paths", Mock(return_value=[])
+        )
+        list_boot_images(self.tftproot)
+        self.assertThat(
+            mock_walk_paths, MockAnyCall(self.tftproot, [params["osystem"]], 4)
+        )
+
+    def test_list_boot_images_returns_fresh_list_from_cache(self):
+        params = make_boot_image_storage_params()
+        self.make_image_dir(params, self.tftproot)
+        purposes = ["install", "commissioning", "xinstall"]
+        make_osystem(self, params["osystem"], purposes)
+        first = list_boot_images(self.tftproot)
+        first.clear()
+        self.assertNotEqual([], list_boot_images(self.tftproot))
+
     def test_is_visible_subdir_ignores_regular_files(self):
         plain_file = self.make_file()
         self.assertFalse(
@@ -49,11 +49,14 @@ def is_visible_subdir(directory, subdir):
 
 def list_subdirs(directory):
     """Return a list of non-hidden directories in `directory`."""
-    return [
-        subdir
-        for subdir in os.listdir(directory)
-        if is_visible_subdir(directory, subdir)
-    ]
+    # scandir carries type information from the directory read itself,
+    # avoiding a stat() call per entry (except for symlinks).
+    with os.scandir(directory) as entries:
+        return [
+            entry.name
+            for entry in entries
+            if not entry.name.startswith(".") and entry.is_dir()
+        ]
 
 
 def extend_path(directory, path):
@@ -75,6 +78,35 @@ def extend_path(directory, path):
     ]
 
 
+def _walk_paths(directory, path, levels, _dirpath=None):
+    """Yield `path` extended by `levels` further directory levels.
+
+    Walks the tree depth-first in a single pass, rather than
+    materialising a full list of paths per level as repeated
+    `drill_down` calls would.
+
+    :param directory: Base directory that `path` is relative to.
+    :param path: A path to a subdirectory of `directory`, represented as
+        a list of path elements relative to `directory`.
+    :param levels: Number of directory levels to descend.
+    """
+    # Carry the joined directory down the recursion so each node costs a
+    # single concatenation instead of an os.path.join from the root.
+    # These are all POSIX paths, so the hard-coded slash is fine.
+    if _dirpath is None:
+        _dirpath = os.path.join(directory, *path)
+    if levels == 0:
+        yield path
+    else:
+        for subdir in list_subdirs(_dirpath):
+            yield from _walk_paths(
+                directory,
+                path + [subdir],
+                levels - 1,
+                f"{_dirpath}/{subdir}",
+            )
+
+
 def drill_down(directory, paths):
     """Find the extensions of `paths` one level deeper into the filesystem.
 
@@ -152,17 +184,21 @@ def extract_image_params(path, maas_meta):
         arch, subarch, release, label
     )
 
+    # The meta-data only depends on the path, not the purpose, so
+    # extract it once and share it across the per-purpose dicts.
+    base = dict(
+        osystem=osystem,
+        architecture=arch,
+        subarchitecture=subarch,
+        release=release,
+        label=label,
+    )
+    base.update(extract_metadata(maas_meta, base))
+
     # Expand the path into a list of dicts, one for each boot purpose.
     params = []
     for purpose in purposes:
-        image = dict(
-            osystem=osystem,
-            architecture=arch,
-            subarchitecture=subarch,
-            release=release,
-            label=label,
-            purpose=purpose,
-        )
+        image = dict(base, purpose=purpose)
         if (
             purpose == BOOT_IMAGE_PURPOSE.XINSTALL
             or purpose == BOOT_IMAGE_PURPOSE.EPHEMERAL
@@ -177,11 +213,6 @@ def extract_image_params(path, maas_meta):
             image["xinstall_type"] = ""
         params.append(image)
 
-    # Merge in the meta-data.
-    for image_dict in params:
-        metadata = extract_metadata(maas_meta, image_dict)
-        image_dict.update(metadata)
-
     return params
 
 
@@ -207,13 +238,48 @@ def maas_meta_last_modified(tftproot):
         raise
 
 
+# Cache for `list_boot_images`, mapping each TFTP root to the key from
+# `_list_boot_images_cache_key` and the images listed at that point. The
+# on-disk tree only changes on image import, which rewrites maas.meta,
+# so the mtimes are a reliable invalidation signal.
+_boot_image_cache = {}
+
+
+def _list_boot_images_cache_key(tftproot):
+    """Return a freshness key for the boot-image tree, or None.
+
+    The key combines the mtimes of the TFTP root and the maas.meta file.
+    None means the tree cannot be cached, e.g. the root doesn't exist.
+    """
+    try:
+        root_mtime = os.stat(tftproot).st_mtime_ns
+    except OSError:
+        return None
+    try:
+        meta_mtime = os.stat(maas_meta_file_path(tftproot)).st_mtime_ns
+    except OSError:
+        meta_mtime = None
+    return root_mtime, meta_mtime
+
+
 def list_boot_images(tftproot):
     """List the available boot images.
 
+    Results are cached per TFTP root and recomputed when the root or the
+    maas.meta file is modified, since this is called repeatedly over RPC
+    while the image tree changes only on import.
+
     :param tftproot: TFTP root directory.
     :return: A list of dicts, describing boot images as consumed by the
         `report_boot_images` API call.
     """
+    cache_key = _list_boot_images_cache_key(tftproot)
+    if cache_key is not None:
+        cached = _boot_image_cache.get(tftproot)
+        if cached is not None and cached[0] == cache_key:
+            # Return a copy so that callers cannot corrupt the cache.
+            return list(cached[1])
+
     # The sub-directories directly under tftproot, if they contain
     # images, represent operating systems.
     try:
@@ -229,22 +295,18 @@ def list_boot_images(tftproot):
         # Other error. Propagate.
         raise
 
-    # Starting point for iteration: paths that contain only the
-    # top-level subdirectory of tftproot, i.e. the architecture name.
-    paths = [[subdir] for subdir in potential_osystems]
-
-    # Extend paths deeper into the filesystem, through the levels that
-    # represent architecture, sub-architecture, release, and label.
-    # Any directory that doesn't extend this deep isn't a boot image.
-    for level in ["arch", "subarch", "release", "label"]:
-        paths = drill_down(tftproot, paths)
+    # Walk each osystem tree through the levels that represent
+    # architecture, sub-architecture, release, and label.  Any directory
+    # that doesn't extend this deep isn't a boot image.
+    paths = [
+        path
+        for osystem in potential_osystems
+        for path in _walk_paths(tftproot, [osystem], 4)
+    ]
 
-    # Include bootloaders
+    # Include bootloaders, which only nest bootloader_type/arch deep.
     if "bootloader" in potential_osystems:
-        bootloader_paths = [["bootloader"]]
-        for level in ["bootloader_type", "arch"]:
-            bootloader_paths = drill_down(tftproot, bootloader_paths)
-        paths += bootloader_paths
+        paths.extend(_walk_paths(tftproot, ["bootloader"], 2))
 
     # Get hold of image meta-data stored in the maas.meta file.
     metadata = get_image_metadata(tftproot)
@@ -252,11 +314,15 @@ def list_boot_images(tftproot):
     # Each path we find this way should be a boot image.
     # This gets serialised to JSON, so we really have to return a list, not
     # just any iterable.
-    return list(
+    images = list(
         chain.from_iterable(
             extract_image_params(path, metadata) for path in paths
         )
     )
+    if cache_key is not None:
+        _boot_image_cache[tftproot] = (cache_key, images)
+        return list(images)
+    return images
 
 
 def get_image_metadata(tftproot):
@@ -45,8 +45,11 @@ def get_tentative_data_path(*path_elements):
     # Strip off a leading slash from the given path, if any. If it were left
     # in, it would override preceding path elements and MAAS_ROOT would be
     # ignored later on. The dot is there to make the call work even with zero
-    # path elements.
-    path = join(".", *path_elements).lstrip("/")
+    # path elements. Only relative elements produce a path starting with
+    # the dot, so the strip (and its string copy) can be skipped then.
+    path = join(".", *path_elements)
+    if path.startswith("/"):
+        path = path.lstrip("/")
     path = join(get_path_env("MAAS_ROOT"), path)
     return abspath(path)
 
@@ -100,7 +103,10 @@ def get_path(*path_elements):
     # Strip off a leading slash from the given path, if any. If it were left
     # in, it would override preceding path elements and MAAS_ROOT would be
     # ignored later on. The dot is there to make the call work even with zero
-    # path elements.
-    path = join(".", *path_elements).lstrip("/")
+    # path elements. Only relative elements produce a path starting with
+    # the dot, so the strip (and its string copy) can be skipped then.
+    path = join(".", *path_elements)
+    if path.startswith("/"):
+        path = path.lstrip("/")
     path = join(get_path_env("MAAS_PATH"), path)
     return abspath(path)
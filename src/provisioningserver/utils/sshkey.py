@@ -4,12 +4,19 @@
 """Utilities for working with OpenSSH keys."""
 
 
+import atexit
+import base64
+import binascii
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from itertools import chain
 import os
 from pathlib import Path
 import pipes
+import struct
 from subprocess import CalledProcessError, check_output, PIPE
 from tempfile import TemporaryDirectory
+import threading
 
 from provisioningserver.utils.shell import get_env_with_locale
 
@@ -25,10 +32,105 @@ OPENSSH_PROTOCOL2_KEY_TYPES = frozenset(
 )
 
 
+# Sorted presentation of the recognised key types for error messages,
+# computed once rather than per rejected key.
+_KEY_TYPES_DISPLAY = " ".join(sorted(OPENSSH_PROTOCOL2_KEY_TYPES))
+
+
 class OpenSSHKeyError(ValueError):
     """The given key was not recognised or was corrupt."""
 
 
+# Number of length-prefixed fields in the RFC4253 wire encoding of each
+# recognised key type: the type name itself, then e.g. the two mpints of
+# an RSA key, or the curve name and point of an ECDSA key.
+_KEY_WIRE_FIELD_COUNTS = {
+    "ecdsa-sha2-nistp256": 3,
+    "ecdsa-sha2-nistp384": 3,
+    "ecdsa-sha2-nistp521": 3,
+    "ssh-dss": 5,
+    "ssh-ed25519": 2,
+    "ssh-rsa": 3,
+}
+
+
+def _is_canonical_public_key(keytype, key):
+    """Is `key` already in the form that ssh-keygen(1) would emit?
+
+    Checks that `key` is canonical base64 — it decodes and re-encodes
+    to the same text — and that the decoded blob is a well-formed
+    RFC4253 section 6.6 wire encoding: a sequence of length-prefixed
+    fields that names `keytype` first, has the field count its key
+    family requires, and consumes the blob exactly.  Keys that pass
+    need no ssh-keygen round-trip; anything else falls through to it.
+    """
+    expected_fields = _KEY_WIRE_FIELD_COUNTS.get(keytype)
+    if expected_fields is None:
+        return False
+    try:
+        raw = base64.b64decode(key.encode("ascii"), validate=True)
+    except (UnicodeEncodeError, binascii.Error):
+        return False
+    if base64.b64encode(raw).decode("ascii") != key:
+        return False
+    fields = []
+    offset = 0
+    while offset < len(raw):
+        if offset + 4 > len(raw):
+            return False
+        (length,) = struct.unpack_from(">I", raw, offset)
+        offset += 4
+        if offset + length > len(raw):
+            return False
+        fields.append(raw[offset : offset + length])
+        offset += length
+    if len(fields) != expected_fields:
+        return False
+    return fields[0] == keytype.encode("ascii")
+
+
+# Long-lived scratch directory for the ssh-keygen pipeline, created on
+# first use and reused for every subsequent conversion.  Each thread
+# gets its own intermediate file within it, so concurrent conversions
+# don't contend on a lock.
+_keydir_lock = threading.Lock()
+_keydir = None
+_keyfiles = threading.local()
+
+
+@lru_cache(maxsize=1)
+def _get_ssh_keygen_env():
+    """Return the environment for ssh-keygen invocations, computed once.
+
+    Requests OpenSSH to use /bin/true when prompting for passwords. We
+    also have to redirect stdin from, say, /dev/null so that it doesn't
+    use the terminal (when this is executed from a terminal); that part
+    happens at the call sites.
+    """
+    env = get_env_with_locale()
+    env["SSH_ASKPASS"] = "/bin/true"
+    return env
+
+
+def _get_intermediate_keypath():
+    """Return this thread's locked-down scratch file for key conversion."""
+    global _keydir
+    keypath = getattr(_keyfiles, "keypath", None)
+    if keypath is None:
+        with _keydir_lock:
+            if _keydir is None:
+                _keydir = TemporaryDirectory(prefix="maas-sshkey-")
+                atexit.register(_keydir.cleanup)
+        keypath = Path(_keydir.name).joinpath(
+            "intermediate.%d" % threading.get_ident()
+        )
+        # Ensure that this file is locked-down.
+        keypath.touch()
+        keypath.chmod(0o600)
+        _keyfiles.keypath = keypath
+    return keypath
+
+
 def normalise_openssh_public_key(keytext):
     """Validate and normalise an OpenSSH public key.
 
@@ -107,56 +209,67 @@ def normalise_openssh_public_key(keytext):
     if keytype not in OPENSSH_PROTOCOL2_KEY_TYPES:
         raise OpenSSHKeyError(
             "Key type %s not recognised; it should be one of: %s"
-            % (
-                pipes.quote(keytype),
-                " ".join(sorted(OPENSSH_PROTOCOL2_KEY_TYPES)),
-            )
+            % (pipes.quote(keytype), _KEY_TYPES_DISPLAY)
         )
 
-    env = get_env_with_locale()
-    # Request OpenSSH to use /bin/true when prompting for passwords. We also
-    # have to redirect stdin from, say, /dev/null so that it doesn't use the
-    # terminal (when this is executed from a terminal).
-    env["SSH_ASKPASS"] = "/bin/true"
+    if _is_canonical_public_key(keytype, key):
+        # The key is already in the form the ssh-keygen pipeline would
+        # produce, so skip the two subprocess invocations entirely.
+        return " ".join(chain((keytype, key), comments))
 
-    with TemporaryDirectory(prefix="maas") as tempdir:
-        keypath = Path(tempdir).joinpath("intermediate")
-        # Ensure that this file is locked-down.
-        keypath.touch()
-        keypath.chmod(0o600)
-        # Convert given key to RFC4716 form.
-        keypath.write_text("%s %s" % (keytype, key), "utf-8")
-        try:
-            with open(os.devnull, "r") as devnull:
-                rfc4716key = check_output(
-                    ("ssh-keygen", "-e", "-f", str(keypath)),
-                    stdin=devnull,
-                    stderr=PIPE,
-                    env=env,
-                )
-        except CalledProcessError:
-            raise OpenSSHKeyError(
-                "Key could not be converted to RFC4716 form."
+    env = _get_ssh_keygen_env()
+    keypath = _get_intermediate_keypath()
+    # Convert given key to RFC4716 form.
+    keypath.write_text("%s %s" % (keytype, key), "utf-8")
+    try:
+        with open(os.devnull, "r") as devnull:
+            rfc4716key = check_output(
+                ("ssh-keygen", "-e", "-f", str(keypath)),
+                stdin=devnull,
+                stderr=PIPE,
+                env=env,
             )
-        # Convert RFC4716 back to OpenSSH format public key.
-        keypath.write_bytes(rfc4716key)
-        try:
-            with open(os.devnull, "r") as devnull:
-                opensshkey = check_output(
-                    ("ssh-keygen", "-i", "-f", str(keypath)),
-                    stdin=devnull,
-                    stderr=PIPE,
-                    env=env,
-                )
-        except CalledProcessError:
-            # If this happens it /might/ be an OpenSSH bug. If we've managed
-            # to convert to RFC4716 form then it seems reasonable to assume
-            # that OpenSSH has already given this key its blessing.
-            raise OpenSSHKeyError(
-                "Key could not be converted from RFC4716 form to "
-                "OpenSSH public key form."
+    except CalledProcessError:
+        raise OpenSSHKeyError("Key could not be converted to RFC4716 form.")
+    # Convert RFC4716 back to OpenSSH format public key.
+    keypath.write_bytes(rfc4716key)
+    try:
+        with open(os.devnull, "r") as devnull:
+            opensshkey = check_output(
+                ("ssh-keygen", "-i", "-f", str(keypath)),
+                stdin=devnull,
+                stderr=PIPE,
+                env=env,
             )
-        else:
-            keytype, key = opensshkey.decode("utf-8").split()
+    except CalledProcessError:
+        # If this happens it /might/ be an OpenSSH bug. If we've managed
+        # to convert to RFC4716 form then it seems reasonable to assume
+        # that OpenSSH has already given this key its blessing.
+        raise OpenSSHKeyError(
+            "Key could not be converted from RFC4716 form to "
+            "OpenSSH public key form."
+        )
+    else:
+        keytype, key = opensshkey.decode("utf-8").split()
 
     return " ".join(chain((keytype, key), comments))
+
+
+def normalise_openssh_public_keys(keytexts, max_workers=8):
+    """Validate and normalise a collection of OpenSSH public keys.
+
+    The per-key work on the ssh-keygen fallback path is almost entirely
+    subprocess-bound, so the keys are normalised from a small thread
+    pool; each thread converts through its own intermediate file.
+
+    :param keytexts: Iterable of key texts, one key each.
+    :return: The normalised keys, in the same order as `keytexts`.
+    :raise OpenSSHKeyError: If any key is not recognised or is corrupt.
+    """
+    keytexts = list(keytexts)
+    if len(keytexts) <= 1:
+        return [normalise_openssh_public_key(kt) for kt in keytexts]
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(keytexts))
+    ) as executor:
+        return list(executor.map(normalise_openssh_public_key, keytexts))
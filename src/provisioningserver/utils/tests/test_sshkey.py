@@ -4,15 +4,20 @@
 """Tests for `provisioningserver.utils.sshkey`."""
 
 
+import base64
 import re
+import struct
 
 from testtools.matchers import Equals
 
 from maastesting.factory import factory
-from maastesting.matchers import DocTestMatches
+from maastesting.matchers import DocTestMatches, MockNotCalled
 from maastesting.testcase import MAASTestCase
+from provisioningserver.utils import sshkey
 from provisioningserver.utils.sshkey import (
+    _is_canonical_public_key,
     normalise_openssh_public_key,
+    normalise_openssh_public_keys,
     OpenSSHKeyError,
 )
 
@@ -87,6 +92,83 @@ class TestNormaliseOpenSSHPublicKeyBasics(MAASTestCase):
         )
 
 
+class TestIsCanonicalPublicKey(MAASTestCase):
+    """Tests for `_is_canonical_public_key`."""
+
+    scenarios = sorted(
+        (name, dict(key=key))
+        for name, key in example_openssh_public_keys.items()
+    )
+
+    def test_accepts_key_as_generated_by_ssh_keygen(self):
+        keytype, key, _ = self.key.split()
+        self.assertTrue(_is_canonical_public_key(keytype, key))
+
+    def test_rejects_invalid_base64(self):
+        keytype, key, _ = self.key.split()
+        self.assertFalse(_is_canonical_public_key(keytype, key[:-1]))
+
+    def test_rejects_mismatched_keytype(self):
+        _, key, _ = self.key.split()
+        self.assertFalse(
+            _is_canonical_public_key(factory.make_name("type"), key)
+        )
+
+
+class TestIsCanonicalPublicKeyStructure(MAASTestCase):
+    """Structurally corrupt blobs are rejected even as canonical base64."""
+
+    def test_rejects_corrupt_blob_in_canonical_base64(self):
+        # Canonical base64 of a blob that names ssh-rsa but carries 20
+        # zero bytes instead of the two mpints of an RSA key.
+        blob = struct.pack(">I", 7) + b"ssh-rsa" + bytes(20)
+        key = base64.b64encode(blob).decode("ascii")
+        self.assertFalse(_is_canonical_public_key("ssh-rsa", key))
+
+    def test_rejects_trailing_garbage_after_valid_key(self):
+        keytype, key, _ = example_openssh_public_keys["ed25519"].split()
+        raw = base64.b64decode(key) + bytes(4)
+        garbled = base64.b64encode(raw).decode("ascii")
+        self.assertFalse(_is_canonical_public_key(keytype, garbled))
+
+    def test_corrupt_blob_falls_through_to_ssh_keygen(self):
+        blob = struct.pack(">I", 7) + b"ssh-rsa" + bytes(20)
+        key = "ssh-rsa " + base64.b64encode(blob).decode("ascii")
+        self.assertRaises(OpenSSHKeyError, normalise_openssh_public_key, key)
+
+
+class TestNormaliseOpenSSHPublicKeyFastPath(MAASTestCase):
+    """Canonical keys are normalised without invoking ssh-keygen."""
+
+    def test_canonical_key_skips_ssh_keygen(self):
+        key = example_openssh_public_keys["rsa"]
+        mock_check_output = self.patch(sshkey, "check_output")
+        self.assertThat(normalise_openssh_public_key(key), Equals(key))
+        self.assertThat(mock_check_output, MockNotCalled())
+
+
+class TestNormaliseOpenSSHPublicKeys(MAASTestCase):
+    """Tests for `normalise_openssh_public_keys`."""
+
+    def test_returns_empty_list_for_no_keys(self):
+        self.assertEqual([], normalise_openssh_public_keys([]))
+
+    def test_normalises_keys_preserving_order(self):
+        keys = [
+            example_openssh_public_keys[name]
+            for name in ("rsa", "ed25519", "dsa", "ecdsa256")
+        ]
+        self.assertEqual(keys, normalise_openssh_public_keys(keys))
+
+    def test_raises_for_corrupt_key_in_batch(self):
+        keys = [
+            example_openssh_public_keys["rsa"],
+            factory.make_name("key"),
+            example_openssh_public_keys["ed25519"],
+        ]
+        self.assertRaises(OpenSSHKeyError, normalise_openssh_public_keys, keys)
+
+
 class _TestNormaliseOpenSSHPublicKeyCommon:
     """Mix-in tests for `normalise_openssh_public_key`.
 